@@ -1,41 +1,117 @@
 
 import pandas as pd
 import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.offline import get_plotlyjs_version
 from plotly.subplots import make_subplots
 import numpy as np
 
+# URL del bundle de plotly.js, incluido una sola vez en el <head> del informe.
+# La versión de plotly.js empaquetada no coincide con la del paquete plotly.
+PLOTLY_CDN_URL = f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+
 # --- Funciones de Análisis ---
 
 def calculate_statistics(df):
-    """Calcula estadísticas descriptivas para cada ticker."""
-    stats = df.groupby('ticker')['daily_return'].describe()
+    """Calcula estadísticas descriptivas para cada ticker.
+
+    Equivalente a ``groupby('ticker')['daily_return'].describe()`` pero en una
+    sola pasada vectorizada de NumPy: se ordena por ticker una vez y cada
+    estadística se calcula con ufuncs sobre los cortes contiguos, evitando la
+    construcción de una Series por grupo.
+    """
+    arr = df['daily_return'].to_numpy()
+    tkr = np.asarray(df['ticker'])
+    order = np.argsort(tkr, kind='stable')
+    arr = arr[order]
+    tkr = tkr[order]
+
+    # Límites de cada grupo contiguo de tickers
+    starts = np.concatenate(([0], np.flatnonzero(tkr[1:] != tkr[:-1]) + 1))
+    ends = np.concatenate((starts[1:], [len(arr)]))
+
+    counts = (ends - starts).astype('float64')
+    means = np.add.reduceat(arr, starts) / counts
+    sq_sums = np.add.reduceat(arr * arr, starts)
+    stds = np.sqrt((sq_sums - counts * means ** 2) / (counts - 1))
+    mins = np.minimum.reduceat(arr, starts)
+    maxs = np.maximum.reduceat(arr, starts)
+    quartiles = np.array([np.quantile(arr[s:e], [0.25, 0.5, 0.75])
+                          for s, e in zip(starts, ends)])
+
+    stats = pd.DataFrame({
+        'count': counts,
+        'mean': means,
+        'std': stds,
+        'min': mins,
+        '25%': quartiles[:, 0],
+        '50%': quartiles[:, 1],
+        '75%': quartiles[:, 2],
+        'max': maxs,
+    }, index=pd.Index(tkr[starts], name='ticker'))
     return stats
 
 def calculate_cumulative_returns(df):
-    """Calcula los rendimientos acumulados."""
-    df['cumulative_return'] = (1 + df['daily_return']).cumprod() - 1
+    """Calcula los rendimientos acumulados.
+
+    Usa exp(sum(log1p(x))) - 1 en lugar de cumprod(1 + x) - 1: mismas
+    matemáticas pero numéricamente más estable en series largas y vectorizado
+    por ufuncs de NumPy.
+    """
+    df['cumulative_return'] = np.expm1(np.cumsum(np.log1p(df['daily_return'].to_numpy())))
     return df
 
-def calculate_annualized_volatility(df):
-    """Calcula la volatilidad anualizada."""
-    volatility = df.groupby('ticker')['daily_return'].std() * np.sqrt(252)
+def calculate_mean_std(df, grouped=None):
+    """Calcula media y desviación estándar por ticker en una sola pasada.
+
+    Acepta un SeriesGroupBy ya construido para no rehacer el agrupamiento
+    cuando el llamador lo reutiliza en varios cálculos.
+    """
+    if grouped is None:
+        grouped = df.groupby('ticker', sort=False, observed=True)['daily_return']
+    return grouped.agg(['mean', 'std'])
+
+def calculate_annualized_volatility(agg):
+    """Calcula la volatilidad anualizada a partir del agregado por ticker."""
+    volatility = agg['std'] * np.sqrt(252)
     return volatility.reset_index(name='annualized_volatility')
 
-def calculate_sharpe_ratio(df, risk_free_rate=0.0):
-    """Calcula el Sharpe Ratio."""
-    mean_return = df.groupby('ticker')['daily_return'].mean() * 252
-    std_dev = df.groupby('ticker')['daily_return'].std() * np.sqrt(252)
-    sharpe_ratio = (mean_return - risk_free_rate) / std_dev
+def calculate_sharpe_ratio(agg, risk_free_rate=0.0):
+    """Calcula el Sharpe Ratio a partir del agregado por ticker."""
+    sharpe_ratio = (agg['mean'] * 252 - risk_free_rate) / (agg['std'] * np.sqrt(252))
     return sharpe_ratio.reset_index(name='sharpe_ratio')
 
+def roll_std(x, w):
+    """Desviación estándar móvil de ventana ``w`` en O(N).
+
+    Mantiene sumas acumuladas de x y x² y resta el valor que sale de la
+    ventana, en lugar de recalcular cada ventana desde cero (O(N·W) en el
+    rolling genérico de pandas). Devuelve NaN para las primeras w-1 posiciones.
+    """
+    s = np.cumsum(x)
+    s2 = np.cumsum(x * x)
+    sw = s[w - 1:].copy()
+    sw[1:] -= s[:-w]
+    s2w = s2[w - 1:].copy()
+    s2w[1:] -= s2[:-w]
+    var = (s2w - sw * sw / w) / (w - 1)
+    out = np.full(x.shape, np.nan)
+    out[w - 1:] = np.sqrt(np.maximum(var, 0.0))
+    return out
+
 def calculate_correlation(df_pivot):
-    """Calcula la correlación entre los tickers."""
-    return df_pivot.corr()
+    """Calcula la correlación entre los tickers.
+
+    Descarta una sola vez las filas con NaN y delega en ``np.corrcoef``
+    (covarianza vía BLAS) en lugar del bucle por pares de ``DataFrame.corr``.
+    """
+    vals = df_pivot.dropna().to_numpy()
+    c = np.corrcoef(vals, rowvar=False)
+    return pd.DataFrame(c, index=df_pivot.columns, columns=df_pivot.columns)
 
 # --- Funciones para Generar HTML ---
 
-def get_header_style():
-    return """<style>
+_HEADER_STYLE = """<style>
         body { font-family: Arial, sans-serif; margin: 40px; background-color: #f4f4f9; color: #333; }
         h1, h2 { color: #1a1a2e; }
         h1 { text-align: center; }
@@ -48,36 +124,64 @@ def get_header_style():
         .conclusion { background-color: #e6f7ff; border-left: 5px solid #1a1a2e; padding: 20px; margin-top: 30px; }
     </style>"""
 
+def figure_div(fig, div_id):
+    """Serializa una figura a JSON y devuelve el div + llamada a Plotly.newPlot.
+
+    Más ligero que ``fig.to_html``: una sola pasada de serialización y sin
+    repetir la etiqueta del CDN de plotly.js por figura (va una vez en el head).
+    """
+    fig_json = pio.to_json(fig)
+    return (f'<div id="{div_id}"></div>\n'
+            f'<script>(function(f) {{ Plotly.newPlot("{div_id}", f.data, f.layout); }})({fig_json});</script>')
+
 def generate_html_report(stats, cumulative_returns_fig, volatility, sharpe_ratio, correlation_matrix, rolling_vol_fig, output_path):
-    """Genera un informe HTML con los resultados del análisis."""
-    html_content = f"""<html>
+    """Genera un informe HTML con los resultados del análisis.
+
+    Escribe el informe por secciones sobre un archivo con búfer grande, sin
+    concatenar antes los JSON multi-MB de las figuras en un único str.
+    """
+    with open(output_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        f.write(f"""<html>
 <head>
     <title>Análisis Comparativo de Rendimiento: NVDA vs QQQ</title>
-    {get_header_style()}
+    <script src="{PLOTLY_CDN_URL}" charset="utf-8"></script>
+    {_HEADER_STYLE}
 </head>
 <body>
     <div class="container">
         <h1>Análisis Comparativo de Rendimiento: NVDA vs QQQ (2019-2024)</h1>
-        
+
         <h2>1. Estadísticas Descriptivas de Rendimientos Diarios</h2>
-        <div class="table-container">{stats.to_html()}</div>
-        
+        <div class="table-container">""")
+        f.write(stats.to_html())
+        f.write("""</div>
+
         <h2>2. Rendimiento Acumulado</h2>
-        <div>{cumulative_returns_fig.to_html(full_html=False, include_plotlyjs='cdn')}</div>
-        
+        <div>""")
+        f.write(figure_div(cumulative_returns_fig, 'fig_cumulative'))
+        f.write("""</div>
+
         <h2>3. Métricas de Riesgo y Rendimiento Anualizado</h2>
         <div class="table-container">
             <h3>Volatilidad Anualizada</h3>
-            {volatility.to_html(index=False)}
+            """)
+        f.write(volatility.to_html(index=False))
+        f.write("""
             <h3>Sharpe Ratio (Rendimiento ajustado al Riesgo)</h3>
-            {sharpe_ratio.to_html(index=False)}
+            """)
+        f.write(sharpe_ratio.to_html(index=False))
+        f.write("""
         </div>
-        
+
         <h2>4. Correlación de Rendimientos Diarios</h2>
-        <div class="table-container">{correlation_matrix.to_html()}</div>
+        <div class="table-container">""")
+        f.write(correlation_matrix.to_html())
+        f.write("""</div>
 
         <h2>5. Volatilidad Móvil (Rolling Volatility) - 30 Días</h2>
-        <div>{rolling_vol_fig.to_html(full_html=False, include_plotlyjs='cdn')}</div>
+        <div>""")
+        f.write(figure_div(rolling_vol_fig, 'fig_rolling_vol'))
+        f.write("""</div>
 
         <div class="conclusion">
             <h2>Conclusiones Clave</h2>
@@ -88,32 +192,47 @@ def generate_html_report(stats, cumulative_returns_fig, volatility, sharpe_ratio
         </div>
     </div>
 </body>
-</html>"""
-    
-    with open(output_path, 'w') as f:
-        f.write(html_content)
+</html>""")
     print(f"Informe HTML generado exitosamente en: {output_path}")
 
 def main():
     # --- Carga y Preparación de Datos ---
     try:
-        df = pd.read_csv('rendimientos_diarios.csv', parse_dates=['date'])
+        df = pd.read_parquet('rendimientos_diarios.parquet')
     except FileNotFoundError:
-        print("Error: El archivo 'rendimientos_diarios.csv' no fue encontrado.")
-        return
+        try:
+            df = pd.read_csv(
+                'rendimientos_diarios.csv',
+                engine='pyarrow',
+                parse_dates=['date'],
+                dtype={'ticker': 'category', 'daily_return': 'float32'}
+            )
+        except FileNotFoundError:
+            print("Error: no se encontró 'rendimientos_diarios.parquet' ni 'rendimientos_diarios.csv'.")
+            return
+
+    # Ticker categórico independientemente de la ruta de carga (parquet o
+    # CSV): los groupby hashean códigos enteros en lugar de strings.
+    if df['ticker'].dtype != 'category':
+        df['ticker'] = df['ticker'].astype('category')
 
     df_pivot = df.pivot(index='date', columns='ticker', values='daily_return')
 
     # --- Análisis ---
+    grouped = df.groupby('ticker', observed=True, sort=False)['daily_return']
     stats = calculate_statistics(df)
-    volatility = calculate_annualized_volatility(df)
-    sharpe_ratio = calculate_sharpe_ratio(df)
+    agg = calculate_mean_std(df, grouped=grouped)
+    volatility = calculate_annualized_volatility(agg)
+    sharpe_ratio = calculate_sharpe_ratio(agg)
     correlation_matrix = calculate_correlation(df_pivot)
 
     # --- Gráficos ---
     # Rendimiento Acumulado
-    df_cumulative = df.groupby(['date', 'ticker'])['daily_return'].sum().unstack().cumsum()
-    df_cumulative = (1 + df_pivot).cumprod() - 1
+    vals = df_pivot.to_numpy()
+    df_cumulative = pd.DataFrame(
+        np.expm1(np.cumsum(np.log1p(vals), axis=0)),
+        index=df_pivot.index, columns=df_pivot.columns
+    )
 
     cumulative_returns_fig = go.Figure()
     for ticker in df_cumulative.columns:
@@ -121,7 +240,10 @@ def main():
     cumulative_returns_fig.update_layout(title='Rendimiento Acumulado (2019-2024)', xaxis_title='Fecha', yaxis_title='Rendimiento Acumulado')
 
     # Volatilidad Móvil
-    rolling_vol = df_pivot.rolling(window=30).std() * np.sqrt(252)
+    rolling_vol = pd.DataFrame(
+        np.column_stack([roll_std(vals[:, j], 30) for j in range(vals.shape[1])]) * np.sqrt(252),
+        index=df_pivot.index, columns=df_pivot.columns
+    )
     rolling_vol_fig = go.Figure()
     for ticker in rolling_vol.columns:
         rolling_vol_fig.add_trace(go.Scatter(x=rolling_vol.index, y=rolling_vol[ticker], mode='lines', name=ticker))
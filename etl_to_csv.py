@@ -1,7 +1,10 @@
 
 import os
+import hashlib
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 import yfinance as yf
+import numpy as np
 import pandas as pd
 from typing import List, Optional
 import config
@@ -27,18 +30,59 @@ def get_args():
         default=config.END_DATE,
         help=f'Fecha de fin para la descarga de datos (YYYY-MM-DD). Default: {config.END_DATE}'
     )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Descarga siempre desde yfinance, ignorando la caché local en .cache/.'
+    )
     return parser.parse_args()
 
-def extract_data(tickers: List[str], start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+def _cache_path(tickers: List[str], start_date: str, end_date: str) -> str:
+    """Ruta de caché local para una combinación de tickers y rango de fechas."""
+    key = hashlib.sha1(repr((sorted(tickers), start_date, end_date)).encode()).hexdigest()[:16]
+    return os.path.join('.cache', f'yf_{key}.parquet')
+
+def _download_one(ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """Descarga un solo ticker y aplana las columnas a nombres simples."""
+    frame = yf.download(ticker, start=start_date, end=end_date, progress=False)
+    if isinstance(frame.columns, pd.MultiIndex):
+        frame.columns = frame.columns.droplevel(1)
+    return frame
+
+def _download_parallel(tickers: List[str], start_date: str, end_date: str) -> pd.DataFrame:
+    """Descarga los tickers en hilos concurrentes (la descarga es IO de red).
+
+    Reconstruye el mismo layout de columnas (campo, ticker) que produce
+    ``yf.download`` con la lista completa.
+    """
+    with ThreadPoolExecutor(max_workers=min(8, len(tickers))) as pool:
+        frames = list(pool.map(lambda t: _download_one(t, start_date, end_date), tickers))
+    return pd.concat(frames, axis=1, keys=tickers).swaplevel(axis=1).sort_index(axis=1)
+
+def extract_data(tickers: List[str], start_date: str, end_date: str, use_cache: bool = True) -> Optional[pd.DataFrame]:
     """
     Descarga datos de yfinance para los tickers y rango de fechas especificados.
+
+    Las descargas se guardan en una caché parquet local (.cache/), de modo que
+    ejecuciones sucesivas con los mismos parámetros no repitan la descarga.
     """
+    cache_path = _cache_path(tickers, start_date, end_date)
+    if use_cache and os.path.exists(cache_path):
+        print(f"Paso 1: Reutilizando datos en caché ({cache_path})...")
+        return pd.read_parquet(cache_path)
+
     print(f"Paso 1: Descargando datos para {tickers} desde yfinance...")
     try:
-        data = yf.download(tickers, start=start_date, end=end_date)
+        if len(tickers) > 1:
+            data = _download_parallel(tickers, start_date, end_date)
+        else:
+            data = yf.download(tickers, start=start_date, end=end_date)
         if data.empty:
             print("No se descargaron datos. Verifique los tickers y el rango de fechas.")
             return None
+        if use_cache:
+            os.makedirs('.cache', exist_ok=True)
+            data.to_parquet(cache_path)
         print("Datos descargados exitosamente.")
         return data
     except Exception as e:
@@ -58,34 +102,38 @@ def transform_data(data: pd.DataFrame, tickers: List[str]) -> Optional[pd.DataFr
 
         daily_returns = adj_close.pct_change().dropna()
 
-        value_vars = tickers
-        if isinstance(daily_returns, pd.DataFrame) and len(daily_returns.columns) == 1:
-            value_vars = daily_returns.columns.tolist()
-
-        df_final = daily_returns.reset_index().melt(
-            id_vars=['Date'],
-            value_vars=value_vars,
-            var_name='ticker',
-            value_name='daily_return'
-        )
-        df_final.rename(columns={'Date': 'date'}, inplace=True)
-        
+        # Formato largo construido directamente con arrays de NumPy
+        # (equivalente a melt, sin Index intermedios ni copias extra).
+        cols = daily_returns.columns.tolist()
+        df_final = pd.DataFrame({
+            'date': np.tile(daily_returns.index.to_numpy(), len(cols)),
+            'ticker': pd.Categorical(np.repeat(np.asarray(cols), len(daily_returns))),
+            'daily_return': daily_returns.to_numpy().ravel(order='F'),
+        })
+
         print("Datos transformados exitosamente.")
         return df_final
     except Exception as e:
         print(f"Error durante la transformación de datos: {e}")
         return None
 
-def save_to_csv(df: pd.DataFrame, filename: str = 'rendimientos_diarios.csv'):
+def save_to_csv(df: pd.DataFrame, filename: str = 'rendimientos_diarios.parquet'):
     """
-    Guarda el DataFrame en un archivo CSV.
+    Guarda el DataFrame en disco: parquet (columnar, comprimido y tipado) si la
+    extensión es .parquet, o CSV en caso contrario.
     """
     print(f"Paso 3: Guardando datos en {filename}...")
     try:
-        df.to_csv(filename, index=False)
+        # float32 cubre los ~6 dígitos significativos de un rendimiento diario
+        # y reduce el tamaño en disco y el ancho de banda de cada lectura.
+        df = df.assign(daily_return=df['daily_return'].astype('float32'))
+        if filename.endswith('.parquet'):
+            df.to_parquet(filename, engine='pyarrow', compression='snappy')
+        else:
+            df.to_csv(filename, index=False, float_format='%.6g')
         print(f"Datos guardados exitosamente en {filename}.")
     except Exception as e:
-        print(f"Ocurrió un error al guardar el archivo CSV: {e}")
+        print(f"Ocurrió un error al guardar el archivo: {e}")
 
 def main():
     """
@@ -94,7 +142,7 @@ def main():
     print("Iniciando el proceso ETL para CSV...")
     args = get_args()
     
-    data = extract_data(args.tickers, args.start_date, args.end_date)
+    data = extract_data(args.tickers, args.start_date, args.end_date, use_cache=not args.no_cache)
     if data is not None:
         transformed_data = transform_data(data, args.tickers)
         if transformed_data is not None:
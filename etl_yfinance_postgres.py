@@ -1,5 +1,8 @@
+import io
 import os
+import hashlib
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 import yfinance as yf
 import pandas as pd
 from sqlalchemy import create_engine, text
@@ -58,26 +61,68 @@ def get_args():
         default=config.SSL_MODE,
         help=f"Modo SSL de la conexión a la base de datos (e.g., 'require', 'disable'). Default: {config.SSL_MODE}"
     )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Descarga siempre desde yfinance, ignorando la caché local en .cache/.'
+    )
     return parser.parse_args()
 
-def extract_data(tickers: List[str], start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+def _cache_path(tickers: List[str], start_date: str, end_date: str) -> str:
+    """Ruta de caché local para una combinación de tickers y rango de fechas."""
+    key = hashlib.sha1(repr((sorted(tickers), start_date, end_date)).encode()).hexdigest()[:16]
+    return os.path.join('.cache', f'yf_{key}.parquet')
+
+def _download_one(ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """Descarga un solo ticker y aplana las columnas a nombres simples."""
+    frame = yf.download(ticker, start=start_date, end=end_date, progress=False)
+    if isinstance(frame.columns, pd.MultiIndex):
+        frame.columns = frame.columns.droplevel(1)
+    return frame
+
+def _download_parallel(tickers: List[str], start_date: str, end_date: str) -> pd.DataFrame:
+    """Descarga los tickers en hilos concurrentes (la descarga es IO de red).
+
+    Reconstruye el mismo layout de columnas (campo, ticker) que produce
+    ``yf.download`` con la lista completa.
+    """
+    with ThreadPoolExecutor(max_workers=min(8, len(tickers))) as pool:
+        frames = list(pool.map(lambda t: _download_one(t, start_date, end_date), tickers))
+    return pd.concat(frames, axis=1, keys=tickers).swaplevel(axis=1).sort_index(axis=1)
+
+def extract_data(tickers: List[str], start_date: str, end_date: str, use_cache: bool = True) -> Optional[pd.DataFrame]:
     """
     Descarga datos de yfinance para los tickers y rango de fechas especificados.
 
+    Las descargas se guardan en una caché parquet local (.cache/), de modo que
+    ejecuciones sucesivas con los mismos parámetros no repitan la descarga.
+
     Args:
         tickers: Lista de tickers a descargar.
         start_date: Fecha de inicio (YYYY-MM-DD).
         end_date: Fecha de fin (YYYY-MM-DD).
+        use_cache: Si es True, reutiliza/alimenta la caché local.
 
     Returns:
         Un DataFrame de pandas con los datos descargados, o None si ocurre un error.
     """
+    cache_path = _cache_path(tickers, start_date, end_date)
+    if use_cache and os.path.exists(cache_path):
+        print(f"Paso 1: Reutilizando datos en caché ({cache_path})...")
+        return pd.read_parquet(cache_path)
+
     print(f"Paso 1: Descargando datos para {tickers} desde yfinance...")
     try:
-        data = yf.download(tickers, start=start_date, end=end_date)
+        if len(tickers) > 1:
+            data = _download_parallel(tickers, start_date, end_date)
+        else:
+            data = yf.download(tickers, start=start_date, end=end_date)
         if data.empty:
             print("No se descargaron datos. Verifique los tickers y el rango de fechas.")
             return None
+        if use_cache:
+            os.makedirs('.cache', exist_ok=True)
+            data.to_parquet(cache_path)
         print("Datos descargados exitosamente.")
         return data
     except Exception as e:
@@ -88,12 +133,15 @@ def transform_data(data: pd.DataFrame, tickers: List[str]) -> Optional[pd.DataFr
     """
     Transforma los datos descargados para calcular los rendimientos diarios.
 
+    Devuelve el formato ancho (una columna por ticker): el formato largo nunca
+    se materializa; ``iter_csv_lines`` lo genera fila a fila al cargarlo.
+
     Args:
         data: DataFrame con los datos de yfinance.
         tickers: Lista de tickers.
 
     Returns:
-        Un DataFrame de pandas con los datos transformados, o None si ocurre un error.
+        Un DataFrame ancho con los rendimientos diarios, o None si ocurre un error.
     """
     print("Paso 2: Transformando los datos...")
     try:
@@ -104,53 +152,91 @@ def transform_data(data: pd.DataFrame, tickers: List[str]) -> Optional[pd.DataFr
 
         daily_returns = adj_close.pct_change().dropna()
 
-        value_vars = tickers
-        if isinstance(daily_returns, pd.DataFrame) and len(daily_returns.columns) == 1:
-            value_vars = daily_returns.columns.tolist()
-
-        df_final = daily_returns.reset_index().melt(
-            id_vars=['Date'],
-            value_vars=value_vars,
-            var_name='ticker',
-            value_name='daily_return'
-        )
-        df_final.rename(columns={'Date': 'date'}, inplace=True)
-        
         print("Datos transformados exitosamente.")
-        print("Vista previa de los datos a cargar:")
-        print(df_final.head())
-        return df_final
+        print("Vista previa de los rendimientos a cargar:")
+        print(daily_returns.head())
+        return daily_returns
     except Exception as e:
         print(f"Error durante la transformación de datos: {e}")
         return None
 
-def create_table_if_not_exists(engine, table_name):
+def iter_csv_lines(daily_returns: pd.DataFrame):
     """
-    Crea la tabla en la base de datos si no existe.
+    Genera líneas CSV (date,ticker,daily_return) columna por columna, en el
+    mismo orden que producía el DataFrame largo pero sin materializarlo.
+    """
+    dates = [d.date().isoformat() for d in daily_returns.index]
+    for ticker in daily_returns.columns:
+        values = daily_returns[ticker].to_numpy()
+        for date_str, value in zip(dates, values):
+            yield f"{date_str},{ticker},{value:.6g}\n"
+
+class _IteratorIO(io.TextIOBase):
+    """Stream de solo lectura sobre un generador de líneas, para copy_expert."""
+
+    def __init__(self, lines):
+        self._lines = lines
+        self._remainder = ''
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        chunks = [self._remainder]
+        total = len(self._remainder)
+        self._remainder = ''
+        for line in self._lines:
+            chunks.append(line)
+            total += len(line)
+            if 0 <= size <= total:
+                break
+        data = ''.join(chunks)
+        if 0 <= size < len(data):
+            data, self._remainder = data[:size], data[size:]
+        return data
+
+# Engine compartido por el módulo: se crea perezosamente y se reutiliza entre
+# llamadas para no pagar un handshake TCP/TLS nuevo contra RDS por operación.
+_engine = None
+_engine_uri = None
+
+def get_engine(db_uri: str):
+    """Devuelve el engine compartido, creándolo en la primera llamada."""
+    global _engine, _engine_uri
+    if _engine is None or _engine_uri != db_uri:
+        # executemany_mode cubre cualquier inserción por lotes que no pase por
+        # COPY: psycopg2 agrupa ~5000 filas por INSERT multi-VALUES.
+        _engine = create_engine(
+            db_uri,
+            pool_pre_ping=True,
+            pool_size=1,
+            executemany_mode='values_plus_batch',
+            insertmanyvalues_page_size=5000,
+        )
+        _engine_uri = db_uri
+    return _engine
+
+def create_table_if_not_exists(connection, table_name):
+    """
+    Crea la tabla en la base de datos si no existe, usando la conexión dada.
     """
     create_table_query = f"""
     CREATE TABLE IF NOT EXISTS "{table_name}" (
         id SERIAL PRIMARY KEY,
-        date TIMESTAMP,
+        date DATE,
         ticker VARCHAR(10),
-        daily_return FLOAT
+        daily_return REAL
     );
     """
-    try:
-        with engine.connect() as connection:
-            with connection.begin():
-                connection.execute(text(create_table_query))
-        print(f"Tabla '{table_name}' verificada/creada exitosamente.")
-    except Exception as e:
-        print(f"Error al crear la tabla '{table_name}': {e}")
-        raise
+    connection.execute(text(create_table_query))
+    print(f"Tabla '{table_name}' verificada/creada exitosamente.")
 
-def load_data(df: pd.DataFrame, db_host: str, db_name: str, db_user: str, db_password: str, table_name: str, sslmode: str):
+def load_data(daily_returns: pd.DataFrame, db_host: str, db_name: str, db_user: str, db_password: str, table_name: str, sslmode: str):
     """
-    Carga los datos transformados en la base de datos PostgreSQL.
+    Carga los rendimientos diarios en la base de datos PostgreSQL.
 
     Args:
-        df: DataFrame con los datos a cargar.
+        daily_returns: DataFrame ancho (una columna por ticker) a cargar.
         db_host: Host de la base de datos.
         db_name: Nombre de la base de datos.
         db_user: Usuario de la base de datos.
@@ -167,22 +253,24 @@ def load_data(df: pd.DataFrame, db_host: str, db_name: str, db_user: str, db_pas
     db_uri = f"postgresql://{db_user}:{db_password}@{db_host}:5432/{db_name}?sslmode={sslmode}"
 
     try:
-        engine = create_engine(db_uri)
-        
-        # Crear tabla si no existe
-        create_table_if_not_exists(engine, table_name)
-
-        with engine.connect() as connection:
-            with connection.begin():
-                print(f"Vaciando la tabla '{table_name}'...")
-                connection.execute(text(f'TRUNCATE TABLE "{table_name}" RESTART IDENTITY;'))
-                print("Tabla vaciada exitosamente.")
-
-                df.to_sql(
-                    table_name,
-                    connection,
-                    if_exists='append',
-                    index=False
+        engine = get_engine(db_uri)
+
+        # Una sola conexión y una sola transacción para DDL, TRUNCATE y COPY:
+        # ahorra handshakes TLS y revierte todo atómicamente si la carga falla.
+        with engine.begin() as connection:
+            create_table_if_not_exists(connection, table_name)
+
+            print(f"Vaciando la tabla '{table_name}'...")
+            connection.execute(text(f'TRUNCATE TABLE "{table_name}" RESTART IDENTITY;'))
+            print("Tabla vaciada exitosamente.")
+
+            # COPY FROM STDIN consume el generador de filas directamente:
+            # ni el formato largo ni su CSV existen completos en memoria.
+            buffer = _IteratorIO(iter_csv_lines(daily_returns))
+            with connection.connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f'COPY "{table_name}" (date, ticker, daily_return) FROM STDIN WITH CSV',
+                    buffer
                 )
         print(f"¡Proceso ETL completado! Los datos han sido cargados en la tabla '{table_name}'.")
     except OperationalError as e:
@@ -198,7 +286,7 @@ def main():
     print("Iniciando el proceso ETL...")
     args = get_args()
     
-    data = extract_data(args.tickers, args.start_date, args.end_date)
+    data = extract_data(args.tickers, args.start_date, args.end_date, use_cache=not args.no_cache)
     if data is not None:
         transformed_data = transform_data(data, args.tickers)
         if transformed_data is not None: